@@ -15,7 +15,8 @@ requirements = [
     "click >= 8.0.0",
     "fastapi >= 0.68.0",
     "uvicorn >= 0.15.0",
-    "jinja2 >= 3.0.0"
+    "jinja2 >= 3.0.0",
+    "tomli >= 1.1.0; python_version < '3.11'"
 ]
 
 setup(
@@ -52,6 +53,9 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        "speedups": ["orjson >= 3.0.0", "uvicorn[standard] >= 0.15.0"],
+    },
     entry_points={
         "console_scripts": [
             "projviz=projviz.cli:main",
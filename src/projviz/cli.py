@@ -1,9 +1,10 @@
 import click
-import json
+import glob
+import os
+import tempfile
 import time
 from pathlib import Path
-from .scanner import ProjectScanner
-from .server import start_server
+from .scanner import ProjectScanner, write_json
 
 @click.group()
 def main():
@@ -16,14 +17,17 @@ def main():
               help='Output JSON file name')
 @click.option('--list', 'list_paths', is_flag=True,
               help='Print all files and folders in sorted order while scanning')
-@click.option('--ignore', multiple=True, help='Additional ignore patterns (can be repeated)')
-def scan(path, output, list_paths, ignore):
+@click.option('--ignore', multiple=True,
+              help='Additional ignore patterns, matched anywhere in a name (can be repeated)')
+@click.option('--stream', is_flag=True,
+              help='Write compact JSON while scanning instead of building the tree in memory')
+def scan(path, output, list_paths, ignore, stream):
     """Scan project structure and generate JSON output"""
     try:
         t0 = time.perf_counter()
         scanner = ProjectScanner(path)
         if ignore:
-            scanner.ignore_patterns.extend(ignore)
+            scanner.ignore_substrings.extend(ignore)
 
         printer = None
         if list_paths:
@@ -39,35 +43,41 @@ def scan(path, output, list_paths, ignore):
                     click.echo(f"{indent}-{Path(label).name}")
             printer = _printer
 
-        result = scanner.scan_project(printer=printer)
-        t1 = time.perf_counter()
-        
-        with open(output, 'w') as f:
-            json.dump(result, f, indent=2)
+        if stream:
+            # Stream into a hidden sibling file, ignored by the scan, and move it
+            # into place at the end: the output never lists itself half-written
+            # and an interrupted scan leaves the previous output intact
+            out_path = Path(output).resolve()
+            fd, tmp_name = tempfile.mkstemp(dir=out_path.parent, prefix=f'.{out_path.name}.', suffix='.tmp')
+            # Escaped: an output name like tree[v2].json would otherwise be a glob
+            scanner.ignore_patterns.append(glob.escape(Path(tmp_name).name))
+            try:
+                with os.fdopen(fd, 'wb', buffering=1 << 16) as fp:
+                    metadata = scanner.stream_project(fp, printer=printer)
+                # mkstemp creates the file 0600; give it the mode a plain
+                # open() would, as the non-streaming path does
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp_name, 0o666 & ~umask)
+                os.replace(tmp_name, out_path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+            t1 = time.perf_counter()
+        else:
+            result = scanner.scan_project(printer=printer)
+            t1 = time.perf_counter()
+            write_json(result, output)
+            metadata = result['metadata']
         
         click.echo(f"Project structure saved to {output}")
-        click.echo(f"Detected framework: {result['metadata']['framework']}")
-        click.echo(f"Project name: {result['metadata']['project_name']}")
-
-        # Additional scan report
-        def _count(node):
-            folders = 0
-            files = 0
-            if not isinstance(node, dict):
-                return folders, files
-            if node.get('type') == 'folder':
-                folders += 1
-                for child in node.get('data', []) or []:
-                    f2, f3 = _count(child)
-                    folders += f2
-                    files += f3
-            else:
-                files += 1
-            return folders, files
+        click.echo(f"Detected framework: {metadata['framework']}")
+        click.echo(f"Project name: {metadata['project_name']}")
 
-        folders, files = _count(result.get('tree', {}))
+        # Additional scan report, from the totals the scanner kept while walking
+        folders, files = scanner.folder_count, scanner.file_count
         total_nodes = folders + files
-        root_children = len((result.get('tree') or {}).get('data', []) or [])
+        root_children = scanner.root_child_count
         duration_ms = int((t1 - t0) * 1000)
 
         click.echo(
@@ -89,6 +99,10 @@ def serve(json_file, port, host):
         click.echo(f"Error: JSON file {json_file} not found. Run 'scan' first.", err=True)
         raise click.Abort()
     
+    # Deferred: FastAPI, Uvicorn and Jinja2 take longer to import than the
+    # rest of the package, and only this command needs them
+    from .server import start_server
+    
     click.echo(f"Starting visualization server on http://{host}:{port}")
     click.echo("Press Ctrl+C to stop the server")
     try:
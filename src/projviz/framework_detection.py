@@ -2,165 +2,387 @@
 Framework detection utilities for Project VizTree
 """
 
+import functools
+import os
 import re
+import time
+from collections import Counter, deque
 from pathlib import Path
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterator, List, Mapping, Optional, Set, Tuple, Union
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib  # type: ignore[no-redef, import-not-found]
+
+# Tool and cache directories skipped by default; ProjectScanner starts its
+# ignore_patterns from this list, and code analysis never searches them
+DEFAULT_IGNORE_NAMES = ('.git', '__pycache__', '.venv', 'node_modules', '.pytest_cache', '.mypy_cache')
+_SKIP_DIRS = frozenset(DEFAULT_IGNORE_NAMES)
+
+# Evidence weights used by FrameworkDetector.detect(). A file unique to one
+# framework outranks a declared dependency, a file name several frameworks
+# list (app.py, main.py, wsgi.py) ranks below one, and directories such as
+# templates/ or static/ are shared between frameworks, so they only break ties.
+FILE_WEIGHT = 4
+SHARED_FILE_WEIGHT = 2
+DEPENDENCY_WEIGHT = 3
+DIRECTORY_WEIGHT = 1
+
+# Opened in binary mode on every platform
+_O_RDONLY_BINARY = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+
+def _slurp(path: Union[str, Path], limit: int = 1 << 20) -> bytes:
+    """Return up to limit bytes of a file with one open and one read.
+
+    Skips the buffered I/O and codec layers; callers search the raw bytes.
+    """
+    fd = os.open(path, _O_RDONLY_BINARY)
+    try:
+        return os.read(fd, limit)
+    finally:
+        os.close(fd)
+
+# A requirement's name ends at the first extras/version/marker/comment character
+_REQUIREMENT_NAME_END = re.compile(r'[\s\[<>=!~;@#,(]')
+
+def _requirement_name(spec: str) -> str:
+    """Return the normalized distribution name of a requirement string"""
+    spec = spec.strip()
+    end = _REQUIREMENT_NAME_END.search(spec)
+    name = spec[:end.start()] if end else spec
+    return name.lower().replace('_', '-')
+
+def _requirements_from_text(text: str) -> List[str]:
+    names = []
+    for line in text.splitlines():
+        line = line.strip()
+        # Skip blanks, comments and pip options such as -r / -e / --index-url
+        if not line or line.startswith(('#', '-')):
+            continue
+        name = _requirement_name(line)
+        if name:
+            names.append(name)
+    return names
+
+def _pyproject_from_bytes(raw: bytes) -> List[str]:
+    try:
+        data = tomllib.loads(raw.decode('utf-8'))
+    except (UnicodeDecodeError, tomllib.TOMLDecodeError):
+        return []
+    project = data.get('project', {})
+    poetry = data.get('tool', {}).get('poetry', {})
+    specs = list(project.get('dependencies', [])) + list(poetry.get('dependencies', {}).keys())
+    return [name for name in map(_requirement_name, specs) if name]
+
+def parse_requirements(path: Path) -> List[str]:
+    """Return the normalized package names listed in a requirements file"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return _requirements_from_text(f.read())
+
+def parse_pyproject_dependencies(path: Path) -> List[str]:
+    """Return the normalized package names declared in a pyproject.toml.
+
+    Reads PEP 621 [project] dependencies and Poetry's
+    [tool.poetry.dependencies]; a file that is not valid TOML has none.
+    """
+    with open(path, 'rb') as f:
+        return _pyproject_from_bytes(f.read())
+
+# Display details per framework; shared by every detector instance
+_FRAMEWORK_INFO: Dict[str, Dict[str, str]] = {
+    'django': {
+        'name': 'Django',
+        'description': 'High-level Python web framework',
+        'website': 'https://djangoproject.com/',
+        'color': '#092e20'
+    },
+    'flask': {
+        'name': 'Flask',
+        'description': 'Lightweight WSGI web application framework',
+        'website': 'https://flask.palletsprojects.com/',
+        'color': '#000000'
+    },
+    'fastapi': {
+        'name': 'FastAPI',
+        'description': 'Modern, fast web framework for building APIs',
+        'website': 'https://fastapi.tiangolo.com/',
+        'color': '#009688'
+    },
+    'pyramid': {
+        'name': 'Pyramid',
+        'description': 'Minimalist Python web framework',
+        'website': 'https://trypyramid.com/',
+        'color': '#8B4513'
+    },
+    'tornado': {
+        'name': 'Tornado',
+        'description': 'Python web framework and networking library',
+        'website': 'https://www.tornadoweb.org/',
+        'color': '#FF6B35'
+    },
+    'unknown': {
+        'name': 'Unknown',
+        'description': 'No recognizable framework detected',
+        'website': '',
+        'color': '#6c757d'
+    }
+}
+
+# Indicator tables per framework, in priority order. Built once at import
+# and shared read-only by every detector instance.
+_FRAMEWORK_INDICATORS: Mapping[str, Dict[str, Tuple[str, ...]]] = MappingProxyType({
+    'django': {
+        'files': ('manage.py', 'wsgi.py', 'asgi.py', 'settings.py'),
+        'directories': ('django', 'apps', 'templates', 'static'),
+        'imports': ('django', 'django.db', 'django.contrib'),
+        'patterns': (r'from django\.', r'import django', r'DJANGO_SETTINGS_MODULE')
+    },
+    'flask': {
+        'files': ('app.py', 'application.py', 'flask_app.py', 'wsgi.py'),
+        'directories': ('templates', 'static', 'instance'),
+        'imports': ('flask', 'Flask'),
+        'patterns': (r'from flask import', r'app = Flask', r'@app\.route')
+    },
+    'fastapi': {
+        'files': ('main.py', 'app.py', 'fastapi_app.py'),
+        'directories': ('routers', 'api', 'models'),
+        'imports': ('fastapi', 'FastAPI'),
+        'patterns': (r'from fastapi import', r'app = FastAPI', r'@app\.get', r'@app\.post')
+    },
+    'pyramid': {
+        'files': ('development.ini', 'production.ini'),
+        'directories': ('pyramid',),
+        'imports': ('pyramid', 'pyramid.config'),
+        'patterns': (r'from pyramid\.', r'config\.make_wsgi_app')
+    },
+    'tornado': {
+        'files': ('main.py', 'app.py'),
+        'directories': ('tornado',),
+        'imports': ('tornado', 'tornado.web'),
+        'patterns': (r'from tornado\.', r'tornado\.web\.Application')
+    }
+})
+
+# Anything keyed by modification time, such as a cached parse or listing, is
+# not stored while the mtime is this recent: a change within the same tick
+# would leave it equal. Covers coarse timestamps such as FAT's two seconds.
+_RACY_WINDOW_NS = 2_000_000_000
+
+# The same file and directory names as frozensets, for intersecting with a listing
+_INDICATOR_FILES = {fw: frozenset(ind['files']) for fw, ind in _FRAMEWORK_INDICATORS.items()}
+_INDICATOR_DIRS = {fw: frozenset(ind['directories']) for fw, ind in _FRAMEWORK_INDICATORS.items()}
+
+# How much finding each indicator file says, by how many frameworks list it
+_FILE_NAME_COUNTS = Counter(name for names in _INDICATOR_FILES.values() for name in names)
+_FILE_NAME_WEIGHTS = {
+    name: FILE_WEIGHT if count == 1 else SHARED_FILE_WEIGHT
+    for name, count in _FILE_NAME_COUNTS.items()
+}
+
+# Any known framework name. A dependency file that never mentions one cannot
+# declare one, so it is not parsed at all.
+_DEPS_RE = re.compile(b'|'.join(fw.encode() for fw in _FRAMEWORK_INDICATORS), re.IGNORECASE)
+
+@functools.lru_cache(maxsize=64)
+def _cached_dependency_names(path: str, mtime_ns: int, size: int) -> FrozenSet[str]:
+    raw = _slurp(path, size + 1)
+    if not _DEPS_RE.search(raw):
+        return frozenset()
+    if path.endswith('.toml'):
+        return frozenset(_pyproject_from_bytes(raw))
+    return frozenset(_requirements_from_text(raw.decode('utf-8', errors='replace')))
+
+def dependency_names(path: Union[str, Path]) -> FrozenSet[str]:
+    """Return the package names declared in a requirements file or pyproject.toml.
+
+    Parses are cached by path, modification time and size, so a long-running
+    server re-reads a file only after it changes. A file modified too
+    recently for its mtime to be trusted is parsed without being cached.
+    """
+    checked_at = time.time_ns()
+    st = os.stat(path)
+    if checked_at - st.st_mtime_ns <= _RACY_WINDOW_NS:
+        return _cached_dependency_names.__wrapped__(os.fspath(path), st.st_mtime_ns, st.st_size)
+    return _cached_dependency_names(os.fspath(path), st.st_mtime_ns, st.st_size)
+
+def _compile_code_patterns(framework_indicators: Mapping[str, Dict[str, Tuple[str, ...]]]) -> "re.Pattern[bytes]":
+    """Build one alternation over every framework's code patterns.
+
+    Each framework gets a named group, so a single search per file tells
+    which framework matched. Python source is case-sensitive, and matching
+    case-sensitively keeps the search on the regex engine's fast path.
+    """
+    return re.compile(
+        b'|'.join(
+            b'(?P<%s>%s)' % (framework.encode(), b'|'.join(p.encode() for p in indicators['patterns']))
+            for framework, indicators in framework_indicators.items()
+        )
+    )
 
 class FrameworkDetector:
     """Enhanced framework detection with multiple strategies"""
     
+    framework_indicators = _FRAMEWORK_INDICATORS
+    # Compiled once at import time rather than per instance
+    _code_re = _compile_code_patterns(_FRAMEWORK_INDICATORS)
+    
     def __init__(self, root_path: Path):
         self.root_path = root_path
-        self.framework_indicators = {
-            'django': {
-                'files': ['manage.py', 'wsgi.py', 'asgi.py', 'settings.py'],
-                'directories': ['django', 'apps', 'templates', 'static'],
-                'imports': ['django', 'django.db', 'django.contrib'],
-                'patterns': [r'from django\.', r'import django', r'DJANGO_SETTINGS_MODULE']
-            },
-            'flask': {
-                'files': ['app.py', 'application.py', 'flask_app.py', 'wsgi.py'],
-                'directories': ['templates', 'static', 'instance'],
-                'imports': ['flask', 'Flask'],
-                'patterns': [r'from flask import', r'app = Flask', r'@app\.route']
-            },
-            'fastapi': {
-                'files': ['main.py', 'app.py', 'fastapi_app.py'],
-                'directories': ['routers', 'api', 'models'],
-                'imports': ['fastapi', 'FastAPI'],
-                'patterns': [r'from fastapi import', r'app = FastAPI', r'@app\.get', r'@app\.post']
-            },
-            'pyramid': {
-                'files': ['development.ini', 'production.ini'],
-                'directories': ['pyramid'],
-                'imports': ['pyramid', 'pyramid.config'],
-                'patterns': [r'from pyramid\.', r'config\.make_wsgi_app']
-            },
-            'tornado': {
-                'files': ['main.py', 'app.py'],
-                'directories': ['tornado'],
-                'imports': ['tornado', 'tornado.web'],
-                'patterns': [r'from tornado\.', r'tornado\.web\.Application']
-            }
+        self._signals: Optional[Dict[str, Tuple[int, int, int]]] = None
+    
+    def _root_listing(self) -> Dict[str, bool]:
+        """List the project root once, as name -> is_dir"""
+        try:
+            with os.scandir(self.root_path) as it:
+                return {e.name: e.is_dir() for e in it}
+        except OSError:
+            return {}
+    
+    def _dependency_names(self, root_entries: Dict[str, bool]) -> Set[str]:
+        """Collect declared dependencies from the dependency files present at the root"""
+        dependencies: Set[str] = set()
+        # A listed name may be a dangling symlink, so unreadable files are skipped
+        for name in ('requirements.txt', 'pyproject.toml'):
+            if root_entries.get(name) is False:
+                try:
+                    dependencies.update(dependency_names(self.root_path / name))
+                except OSError:
+                    pass
+        if root_entries.get('setup.py') is False:
+            # setup.py is code, not data; fall back to a plain mention check
+            try:
+                content = _slurp(self.root_path / 'setup.py').lower()
+            except OSError:
+                content = b''
+            dependencies.update(fw for fw in self.framework_indicators if fw.encode() in content)
+        return dependencies
+    
+    def _evidence(self, root_entries: Dict[str, bool], dependencies: Set[str]) -> Dict[str, Tuple[int, int, int]]:
+        """Return (file weight, directory hits, dependency hit) per framework, in indicator order.
+
+        The file weight is that of the strongest indicator file present, so
+        several shared names never add up to more than one unique one.
+        """
+        files = {name for name, is_dir in root_entries.items() if not is_dir}
+        dirs = root_entries.keys() - files
+        return {
+            framework: (
+                max((_FILE_NAME_WEIGHTS[name] for name in _INDICATOR_FILES[framework] & files), default=0),
+                len(_INDICATOR_DIRS[framework] & dirs),
+                int(framework in dependencies)
+            )
+            for framework in self.framework_indicators
         }
     
+    def _collect_signals(self) -> Dict[str, Tuple[int, int, int]]:
+        """Gather the root evidence once per detector; every strategy reads from it"""
+        if self._signals is None:
+            root_entries = self._root_listing()
+            self._signals = self._evidence(root_entries, self._dependency_names(root_entries))
+        return self._signals
+    
+    @staticmethod
+    def _first_with(evidence: Dict[str, Tuple[int, int, int]], kind: int) -> Optional[str]:
+        for framework, hits in evidence.items():
+            if hits[kind]:
+                return framework
+        return None
+    
     def detect_by_files(self) -> Optional[str]:
         """Detect framework by looking for characteristic files"""
-        for framework, indicators in self.framework_indicators.items():
-            for file_name in indicators['files']:
-                if (self.root_path / file_name).exists():
-                    return framework
-        return None
+        return self._first_with(self._collect_signals(), 0)
     
     def detect_by_directories(self) -> Optional[str]:
         """Detect framework by looking for characteristic directories"""
-        for framework, indicators in self.framework_indicators.items():
-            for dir_name in indicators['directories']:
-                if (self.root_path / dir_name).is_dir():
-                    return framework
-        return None
+        return self._first_with(self._collect_signals(), 1)
     
     def detect_by_dependencies(self) -> Optional[str]:
         """Detect framework by analyzing dependency files"""
-        # Check requirements.txt
-        requirements_file = self.root_path / 'requirements.txt'
-        if requirements_file.exists():
-            content = requirements_file.read_text().lower()
-            for framework in self.framework_indicators.keys():
-                if framework in content:
-                    return framework
-        
-        # Check pyproject.toml
-        pyproject_file = self.root_path / 'pyproject.toml'
-        if pyproject_file.exists():
-            content = pyproject_file.read_text().lower()
-            for framework in self.framework_indicators.keys():
-                if framework in content:
-                    return framework
-        
-        # Check setup.py
-        setup_file = self.root_path / 'setup.py'
-        if setup_file.exists():
-            content = setup_file.read_text().lower()
-            for framework in self.framework_indicators.keys():
-                if framework in content:
-                    return framework
-        
-        return None
+        return self._first_with(self._collect_signals(), 2)
     
+    def _iter_py_files(self, limit: int) -> Iterator[str]:
+        """Yield up to limit .py file paths, breadth-first from the root.
+
+        Stops listing directories as soon as enough files are found, so large
+        trees are never walked in full.
+        """
+        found = 0
+        pending = deque([str(self.root_path)])
+        while pending:
+            try:
+                with os.scandir(pending.popleft()) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _SKIP_DIRS:
+                        pending.append(entry.path)
+                elif entry.name.endswith('.py') and entry.is_file():
+                    yield entry.path
+                    found += 1
+                    if found >= limit:
+                        return
+
     def detect_by_code_analysis(self) -> Optional[str]:
         """Detect framework by analyzing Python code files"""
-        python_files = list(self.root_path.rglob('*.py'))
+        python_files = list(self._iter_py_files(10))  # Limit to first 10 files for performance
         
-        for framework, indicators in self.framework_indicators.items():
-            for pattern in indicators['patterns']:
-                regex = re.compile(pattern, re.IGNORECASE)
-                for py_file in python_files[:10]:  # Limit to first 10 files for performance
-                    try:
-                        content = py_file.read_text()
-                        if regex.search(content):
-                            return framework
-                    except (UnicodeDecodeError, PermissionError):
-                        continue
+        for py_file in python_files:
+            try:
+                # Imports sit at the top, so the first MiB of bytes is plenty; no decoding
+                match = self._code_re.search(_slurp(py_file))
+            except OSError:
+                continue
+            if match:
+                return match.lastgroup
         
         return None
     
+    @staticmethod
+    def _best_scored(evidence: Dict[str, Tuple[int, int, int]]) -> Optional[str]:
+        """Return the highest-scoring framework, ties going to the earlier one.
+
+        Directory hits only add to a framework that already has file or
+        dependency evidence, so shared folders never decide on their own.
+        None when no framework has any such evidence.
+        """
+        scores = {}
+        for framework, (files, dirs, deps) in evidence.items():
+            score = files + DEPENDENCY_WEIGHT * deps
+            scores[framework] = score + DIRECTORY_WEIGHT * dirs if score else 0
+        best = max(scores, key=scores.__getitem__)
+        return best if scores[best] else None
+    
+    def detect(self) -> str:
+        """Score every framework from a single pass over the project root.
+
+        Files, directories and declared dependencies are all gathered from
+        one root listing and weighted; the highest score wins, ties going to
+        the earlier framework. Code analysis only runs when no file or
+        dependency at the root points anywhere.
+        """
+        return self._best_scored(self._collect_signals()) or self.detect_by_code_analysis() or 'unknown'
+    
+    def classify_from_signals(self, root_entries: Dict[str, bool]) -> str:
+        """Classify a root listing (name -> is_dir) the caller already has.
+
+        Lets the scanner reuse the listing from its own walk. Only file and
+        dependency evidence is scored: directory names are left out, and
+        code analysis is never run, as it would walk the tree the caller
+        has just walked, without the caller's ignore settings.
+        """
+        evidence = self._evidence(root_entries, self._dependency_names(root_entries))
+        return self._best_scored({
+            framework: (files, 0, deps) for framework, (files, _, deps) in evidence.items()
+        }) or 'unknown'
+    
     def detect_framework(self) -> str:
         """Main detection method using multiple strategies"""
-        # Try different detection methods in order of reliability
-        methods = [
-            self.detect_by_files,
-            self.detect_by_directories,
-            self.detect_by_dependencies,
-            self.detect_by_code_analysis
-        ]
-        
-        for method in methods:
-            result = method()
-            if result:
-                return result
-        
-        return 'unknown'
+        return self.detect()
     
     def get_framework_info(self, framework: str) -> Dict[str, str]:
         """Get additional information about the detected framework"""
-        framework_info = {
-            'django': {
-                'name': 'Django',
-                'description': 'High-level Python web framework',
-                'website': 'https://djangoproject.com/',
-                'color': '#092e20'
-            },
-            'flask': {
-                'name': 'Flask',
-                'description': 'Lightweight WSGI web application framework',
-                'website': 'https://flask.palletsprojects.com/',
-                'color': '#000000'
-            },
-            'fastapi': {
-                'name': 'FastAPI',
-                'description': 'Modern, fast web framework for building APIs',
-                'website': 'https://fastapi.tiangolo.com/',
-                'color': '#009688'
-            },
-            'pyramid': {
-                'name': 'Pyramid',
-                'description': 'Minimalist Python web framework',
-                'website': 'https://trypyramid.com/',
-                'color': '#8B4513'
-            },
-            'tornado': {
-                'name': 'Tornado',
-                'description': 'Python web framework and networking library',
-                'website': 'https://www.tornadoweb.org/',
-                'color': '#FF6B35'
-            },
-            'unknown': {
-                'name': 'Unknown',
-                'description': 'No recognizable framework detected',
-                'website': '',
-                'color': '#6c757d'
-            }
-        }
-        
-        return framework_info.get(framework, framework_info['unknown'])
+        return _FRAMEWORK_INFO.get(framework, _FRAMEWORK_INFO['unknown'])
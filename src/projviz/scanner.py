@@ -1,136 +1,465 @@
+import contextlib
+import fnmatch
+import itertools
+import operator
 import os
+import re
 import sys
 import json
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Tuple, Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Any, BinaryIO, Callable, Optional
 from datetime import datetime
+from .framework_detection import _RACY_WINDOW_NS, DEFAULT_IGNORE_NAMES, FrameworkDetector
+
+try:
+    import orjson  # optional speedup for large trees
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+def dumps_json(data: Any, *, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, via orjson when installed.
+
+    Non-string dict keys are stringified in both paths, like stdlib json.
+    Strings that are not valid Unicode, such as surrogate-escaped names of
+    files whose names are not UTF-8, are written as \\u escapes by stdlib json.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(data, option=option)
+        except TypeError:
+            # orjson rejects lone surrogates; stdlib json escapes them
+            pass
+    if indent:
+        return json.dumps(data, indent=2).encode("ascii")
+    return json.dumps(data, separators=(",", ":")).encode("ascii")
+
+def write_json(data: Any, path: str) -> None:
+    """Write data to path as two-space indented JSON"""
+    Path(path).write_bytes(dumps_json(data, indent=True))
+
+def read_json(path: str) -> Any:
+    """Load a JSON file, via orjson when installed"""
+    raw = Path(path).read_bytes()
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # e.g. \udcff escapes of undecodable file names, which only stdlib json reads
+            pass
+    return json.loads(raw)
+
+# Sort (lowercased name, entry) pairs without comparing the entries themselves
+_SORT_KEY = operator.itemgetter(0)
+
+# JSON string literal for a str; ASCII-only output also keeps names with
+# undecodable bytes (surrogate escapes) writable
+_json_str = json.encoder.encode_basestring_ascii
+
+def _entry_is_dir(entry: os.DirEntry) -> bool:
+    """Whether an entry is, or links to, a directory; False if it can't be stat'ed"""
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
 
 class ProjectScanner:
-    def __init__(self, root_path: str):
+    def __init__(self, root_path: str, max_workers: Optional[int] = None, stringify_ids: bool = False, listing_cache_size: int = 0):
         self.root_path = Path(root_path)
+        # Plain string form for os.* calls; child paths are joined onto it as strings
+        self._root_str = str(self.root_path)
+        # Directory listings kept between scans of the same scanner, keyed by
+        # path and validated against the directory's st_mtime_ns. Worth it for
+        # long-running callers that rescan (e.g. 10_000); 0 disables.
+        self.listing_cache_size = listing_cache_size
+        self._dir_cache: "OrderedDict[str, Tuple[int, Tuple[List[os.DirEntry], List[os.DirEntry]], List[os.DirEntry]]]" = OrderedDict()
+        self._dir_cache_lock = threading.Lock()
+        self._ignore_key: Optional[Tuple[Any, ...]] = None
+        # Node ids are plain ints; set stringify_ids for consumers expecting strings
+        self.stringify_ids = stringify_ids
+        # Threads used to scan top-level folders of the root; 1 scans serially
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._root_display_name = self.root_path.resolve().name
         self.node_counter = 0
-        self.ignore_patterns = ['.git', '__pycache__', '.venv', 'node_modules', '.pytest_cache', '.mypy_cache']
+        # Running totals of scanned nodes, kept alongside node_counter
+        self.folder_count = 0
+        self.file_count = 0
+        # Number of entries directly under the root in the last scan
+        self.root_child_count = 0
+        # Root listing (name -> is_dir) recorded by the last scan, reused by detect_framework
+        self._root_entries: Optional[Dict[str, bool]] = None
+        # Names ignored on exact match, or as globs when they contain */?/[;
+        # ignore_substrings hide any name containing them
+        self.ignore_patterns = list(DEFAULT_IGNORE_NAMES)
+        self.ignore_substrings: List[str] = []
+        self._is_nt = os.name == 'nt'
         # Windows reserved device names that can appear and confuse scanning/rendering
         self._win_reserved = {
             'CON','PRN','AUX','NUL',
             'COM1','COM2','COM3','COM4','COM5','COM6','COM7','COM8','COM9',
             'LPT1','LPT2','LPT3','LPT4','LPT5','LPT6','LPT7','LPT8','LPT9'
         }
+        self._compile_ignore_patterns()
 
     def _is_reserved_windows_name(self, name: str) -> bool:
-        if os.name != 'nt':
+        if not self._is_nt:
             return False
         # Compare without extension and case-insensitive
         stem = name.split('.')[0].upper()
         return stem in self._win_reserved
 
-    def _is_ignored(self, path: Path) -> bool:
-        name = path.name
-        if self._is_reserved_windows_name(name):
+    def _compile_ignore_patterns(self) -> None:
+        """Precompute the ignore checks from the current pattern lists.
+
+        Called again at the start of every scan, so callers may freely
+        replace or extend ignore_patterns/ignore_substrings beforehand.
+        """
+        globs = [p for p in self.ignore_patterns if any(c in p for c in '*?[')]
+        self._ignore_exact = frozenset(p for p in self.ignore_patterns if p not in globs)
+        # All globs are folded into one regex, matched once per name
+        self._ignore_glob_re: Optional[re.Pattern[str]] = re.compile('|'.join(map(fnmatch.translate, globs))) if globs else None
+        # Cached listings are already filtered, so they go stale with the patterns
+        ignore_key = (tuple(self.ignore_patterns), tuple(self.ignore_substrings))
+        if ignore_key != self._ignore_key:
+            self._ignore_key = ignore_key
+            with self._dir_cache_lock:
+                self._dir_cache.clear()
+        self._ignore_substr_re: Optional[re.Pattern[str]]
+        if self.ignore_substrings:
+            self._ignore_substr_re = re.compile('|'.join(map(re.escape, self.ignore_substrings)))
+        else:
+            self._ignore_substr_re = None
+
+    def _is_ignored_name(self, name: str) -> bool:
+        if name in self._ignore_exact:
             return True
-        # Simple substring-based ignore for common folders/files
-        for pattern in self.ignore_patterns:
-            if pattern in name:
-                return True
-        return False
+        if self._ignore_glob_re is not None and self._ignore_glob_re.match(name):
+            return True
+        if self._ignore_substr_re is not None and self._ignore_substr_re.search(name):
+            return True
+        return self._is_nt and self._is_reserved_windows_name(name)
         
     def generate_tree(self, path: Optional[Path] = None, parent_path: str = "", *, printer: Optional[Callable[[str, str, int], None]] = None, depth: int = 0) -> Tuple[Dict, int]:
         if path is None:
             path = self.root_path
-            
-        name = path.name
+        self._compile_ignore_patterns()
         # Normalize to POSIX-style paths for consistency across OSes
         relative_path = path.relative_to(self.root_path).as_posix() if path != self.root_path else ""
-        node_id = str(self.node_counter)
-        self.node_counter += 1
-        
         if path.is_dir():
-            # For root directory, use project name, otherwise use directory name
-            if path == self.root_path:
-                display_name = self.root_path.resolve().name
+            if path == self.root_path and self.max_workers > 1:
+                node = self._generate_tree_parallel(printer)
             else:
-                display_name = name
-            # Print folder when encountered
-            if callable(printer):
-                # Show project name for root, else relative path
-                to_print = display_name if relative_path == "" else relative_path
-                printer('folder', to_print, depth)
-            node = {
-                "id": node_id,
-                "value": display_name,
-                "type": "folder",
-                "path": relative_path,
-                "open": True,  # Open folders by default for better visibility
-                "data": []
-            }
-            
+                node, next_id, folders = self._walk(self._root_str if path == self.root_path else str(path), relative_path, depth, printer, self.node_counter)
+                self._add_counts(next_id - self.node_counter, folders)
+        else:
+            node = self._file_node(self.node_counter, path.name, relative_path, depth, printer)
+            self._add_counts(1, 0)
+        if self.stringify_ids:
+            self._stringify(node)
+        return node, self.node_counter
+
+    def _file_node(self, node_id: int, name: str, rel_path: str, depth: int, printer: Optional[Callable[[str, str, int], None]]) -> Dict:
+        # Print file when encountered
+        if callable(printer):
+            printer('file', rel_path or name, depth)
+        return {
+            "id": node_id,
+            "value": name,
+            "type": "file",
+            "path": rel_path
+        }
+
+    def _folder_node(self, node_id: int, name: str, rel_dir: str, depth: int, printer: Optional[Callable[[str, str, int], None]]) -> Dict:
+        # For root directory, use project name, otherwise use directory name
+        display_name = self._root_display_name if rel_dir == "" else name
+        # Print folder when encountered
+        if callable(printer):
+            # Show project name for root, else relative path
+            printer('folder', rel_dir or display_name, depth)
+        return {
+            "id": node_id,
+            "value": display_name,
+            "type": "folder",
+            "path": rel_dir,
+            "open": True,  # Open folders by default for better visibility
+            "data": []
+        }
+
+    def _list_dir(self, abs_dir: str, node: Dict, skipped: Optional[List[os.DirEntry]] = None) -> Tuple[List[os.DirEntry], List[os.DirEntry]]:
+        """Return the filtered (folders, files) of a directory, each sorted by name.
+
+        When skipped is given, the entries left out as ignored or as symlinks
+        are appended to it.
+        """
+        mtime = None
+        if self.listing_cache_size > 0:
+            # A directory's mtime changes whenever entries are added, removed
+            # or renamed in it, so an unchanged mtime means the listing still
+            # holds. Nested changes are caught because every subdirectory is
+            # validated on its own. That only holds once the mtime is older
+            # than the timestamp granularity: a change within the same tick
+            # leaves it equal. Such "racily clean" listings are not stored,
+            # as git does for its index.
+            listed_at = time.time_ns()
             try:
-                # Deterministic ordering: folders first, then files; alphabetical
-                items = sorted(
-                    [p for p in path.iterdir() if not self._is_ignored(p) and not p.is_symlink()],
-                    key=lambda p: (p.is_file(), p.name.lower())
-                )
-                for item in items:
-                    child_node = self.generate_tree(item, relative_path, printer=printer, depth=depth+1)
-                    node["data"].append(child_node[0])
-            except PermissionError:
-                node["value"] = f"{name} (Permission Denied)"
-                
-            return node, self.node_counter
+                mtime = os.stat(abs_dir).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime is not None:
+                with self._dir_cache_lock:
+                    cached = self._dir_cache.get(abs_dir)
+                    if cached is not None and cached[0] == mtime:
+                        self._dir_cache.move_to_end(abs_dir)
+                        if skipped is not None:
+                            skipped.extend(cached[2])
+                        return cached[1]
+        try:
+            # DirEntry answers is_dir/is_symlink from the directory listing,
+            # so no extra stat() per entry. One pass splits folders from
+            # files and computes each sort key once; the listing is
+            # materialized for sorting, so the scandir handle closes right away.
+            dirs: List[Tuple[str, os.DirEntry]] = []
+            files: List[Tuple[str, os.DirEntry]] = []
+            dropped: List[os.DirEntry] = []
+            with os.scandir(abs_dir) as it:
+                for e in it:
+                    if self._is_ignored_name(e.name) or e.is_symlink():
+                        dropped.append(e)
+                        continue
+                    (dirs if e.is_dir(follow_symlinks=False) else files).append((e.name.lower(), e))
+        except PermissionError:
+            node["value"] = f"{os.path.basename(abs_dir)} (Permission Denied)"
+            return [], []
+        # Deterministic ordering: folders first, then files; alphabetical
+        dirs.sort(key=_SORT_KEY)
+        files.sort(key=_SORT_KEY)
+        listing = ([e for _, e in dirs], [e for _, e in files])
+        if skipped is not None:
+            skipped.extend(dropped)
+        if mtime is not None and listed_at - mtime > _RACY_WINDOW_NS:
+            with self._dir_cache_lock:
+                self._dir_cache[abs_dir] = (mtime, listing, dropped)
+                self._dir_cache.move_to_end(abs_dir)
+                while len(self._dir_cache) > self.listing_cache_size:
+                    self._dir_cache.popitem(last=False)
+        return listing
+
+    def _walk(self, abs_dir: str, rel_dir: str, depth: int, printer: Optional[Callable[[str, str, int], None]], first_id: int) -> Tuple[Dict, int, int]:
+        """Build the subtree rooted at abs_dir, numbering nodes from first_id.
+
+        Iterative pre-order walk over an explicit stack, so deep trees are not
+        bounded by the interpreter recursion limit. Only local state is
+        touched, which keeps it safe to run from worker threads. Returns the
+        subtree, the next free id and the number of folders in the subtree.
+        """
+        ids = itertools.count(first_id)
+        folders = 1
+        root = self._folder_node(next(ids), os.path.basename(abs_dir), rel_dir, depth, printer)
+        if rel_dir == "":
+            skipped: List[os.DirEntry] = []
+            dirs, files = self._list_dir(abs_dir, root, skipped)
+            self._record_root_entries(dirs, files, skipped)
         else:
-            # Print file when encountered
-            if callable(printer):
-                to_print = relative_path if relative_path else name
-                printer('file', to_print, depth)
-            return {
-                "id": node_id,
-                "value": name,
-                "type": "file",
-                "path": relative_path
-            }, self.node_counter
+            dirs, files = self._list_dir(abs_dir, root)
+        stack = [(iter(dirs), files, root, rel_dir, depth + 1)]
+        while stack:
+            subdirs, files, node, parent_rel, child_depth = stack[-1]
+            entry = next(subdirs, None)
+            if entry is None:
+                # Subfolders done; the files follow them in pre-order and are
+                # built in one batch. Child paths are built by concatenation,
+                # no Path.relative_to per node.
+                stack.pop()
+                if files:
+                    prefix = parent_rel + '/' if parent_rel else ''
+                    node["data"].extend([
+                        self._file_node(next(ids), e.name, prefix + e.name, child_depth, printer)
+                        for e in files
+                    ])
+                continue
+            rel_path = parent_rel + '/' + entry.name if parent_rel else entry.name
+            child = self._folder_node(next(ids), entry.name, rel_path, child_depth, printer)
+            folders += 1
+            node["data"].append(child)
+            child_dirs, child_files = self._list_dir(entry.path, child)
+            stack.append((iter(child_dirs), child_files, child, rel_path, child_depth + 1))
+        return root, next(ids), folders
+
+    def _add_counts(self, nodes: int, folders: int) -> None:
+        self.node_counter += nodes
+        self.folder_count += folders
+        self.file_count += nodes - folders
+
+    def _record_root_entries(self, dirs: List[os.DirEntry], files: List[os.DirEntry], skipped: List[os.DirEntry]) -> None:
+        # Framework detection looks at every root name, including those the
+        # tree leaves out: a symlinked or ignored requirements.txt still
+        # declares the project's dependencies.
+        root_entries = {e.name: _entry_is_dir(e) for e in skipped}
+        root_entries.update(dict.fromkeys((e.name for e in dirs), True))
+        root_entries.update(dict.fromkeys((e.name for e in files), False))
+        self.root_child_count = len(dirs) + len(files)
+        self._root_entries = root_entries
+
+    @staticmethod
+    def _renumber(node: Dict, first_id: int) -> None:
+        """Reassign ids in pre-order starting at first_id, matching _walk's numbering"""
+        ids = itertools.count(first_id)
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            current["id"] = next(ids)
+            children = current.get("data")
+            if children:
+                stack.extend(reversed(children))
+
+    @staticmethod
+    def _stringify(node: Dict) -> None:
+        """Convert every node id in the subtree to str, in one pass"""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            current["id"] = str(current["id"])
+            stack.extend(current.get("data", ()))
+
+    def _generate_tree_parallel(self, printer: Optional[Callable[[str, str, int], None]] = None) -> Dict:
+        """Scan each top-level folder on a worker thread and merge the subtrees.
+
+        Directory listing is dominated by syscalls that release the GIL, so
+        threads overlap their latency. Workers number their subtree locally
+        and buffer printer output; both are fixed up here in sorted order, so
+        the result is identical to a serial walk.
+        """
+        root = self._folder_node(self.node_counter, self.root_path.name, "", 0, printer)
+        self._add_counts(1, 1)
+        skipped: List[os.DirEntry] = []
+        dirs, files = self._list_dir(self._root_str, root, skipped)
+        self._record_root_entries(dirs, files, skipped)
+
+        def scan_subtree(entry: os.DirEntry) -> Tuple[Dict, int, int, List[Tuple[str, str, int]]]:
+            events: List[Tuple[str, str, int]] = []
+            sink = (lambda kind, relpath, depth: events.append((kind, relpath, depth))) if callable(printer) else None
+            subtree, next_id, folders = self._walk(entry.path, entry.name, 1, sink, 0)
+            return subtree, next_id, folders, events
+
+        # A single folder gains nothing from a pool
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(dirs))) if len(dirs) > 1 else None
+        with pool or contextlib.nullcontext():
+            # map() yields in submission order, i.e. the sorted folder order
+            for subtree, count, folders, events in (pool.map if pool else map)(scan_subtree, dirs):
+                if printer is not None:
+                    for event in events:
+                        printer(*event)
+                self._renumber(subtree, self.node_counter)
+                self._add_counts(count, folders)
+                root["data"].append(subtree)
+        ids = itertools.count(self.node_counter)
+        root["data"].extend([self._file_node(next(ids), e.name, e.name, 1, printer) for e in files])
+        self._add_counts(len(files), 0)
+        return root
     
+    def stream_tree(self, fp: BinaryIO, *, printer: Optional[Callable[[str, str, int], None]] = None) -> int:
+        """Write the project tree to a binary file as compact JSON while walking it.
+
+        Produces the same tree as generate_tree(), but nodes are written as
+        soon as they are built, so only the listings of the folders on the
+        current path are held in memory. Always scans serially. Returns the
+        number of nodes written.
+        """
+        self._compile_ignore_patterns()
+        first_id = self.node_counter
+        ids = itertools.count(first_id)
+        folders = 1
+        id_fmt = b'"%d"' if self.stringify_ids else b'%d'
+        write = fp.write
+        root = self._folder_node(next(ids), self.root_path.name, "", 0, printer)
+        skipped: List[os.DirEntry] = []
+        dirs, files = self._list_dir(self._root_str, root, skipped)
+        self._record_root_entries(dirs, files, skipped)
+        write(self._folder_json(root, id_fmt))
+        stack = [(iter(dirs), files, "", 1)]
+        # Whether the folder on top of the stack has no children written yet
+        empty = True
+        while stack:
+            subdirs, files, parent_rel, child_depth = stack[-1]
+            entry = next(subdirs, None)
+            if entry is None:
+                stack.pop()
+                if files:
+                    prefix = parent_rel + '/' if parent_rel else ''
+                    chunk = b','.join([
+                        self._file_json(self._file_node(next(ids), e.name, prefix + e.name, child_depth, printer), id_fmt)
+                        for e in files
+                    ])
+                    write(chunk if empty else b',' + chunk)
+                write(b']}')
+                # The closed folder is itself a written child of its parent
+                empty = False
+                continue
+            rel_path = parent_rel + '/' + entry.name if parent_rel else entry.name
+            child = self._folder_node(next(ids), entry.name, rel_path, child_depth, printer)
+            folders += 1
+            child_dirs, child_files = self._list_dir(entry.path, child)
+            head = self._folder_json(child, id_fmt)
+            write(head if empty else b',' + head)
+            stack.append((iter(child_dirs), child_files, rel_path, child_depth + 1))
+            empty = True
+        count = next(ids) - first_id
+        self._add_counts(count, folders)
+        return count
+
+    @staticmethod
+    def _folder_json(node: Dict, id_fmt: bytes) -> bytes:
+        """Opening of a folder node's JSON, up to and including its data array bracket"""
+        return b'{"id":%s,"value":%s,"type":"folder","path":%s,"open":true,"data":[' % (
+            id_fmt % node["id"], _json_str(node["value"]).encode(), _json_str(node["path"]).encode()
+        )
+
+    @staticmethod
+    def _file_json(node: Dict, id_fmt: bytes) -> bytes:
+        return b'{"id":%s,"value":%s,"type":"file","path":%s}' % (
+            id_fmt % node["id"], _json_str(node["value"]).encode(), _json_str(node["path"]).encode()
+        )
+
     def detect_framework(self) -> str:
-        """Detect the Python web framework being used"""
-        framework_indicators = {
-            'django': ['manage.py', 'wsgi.py', 'asgi.py'],
-            'flask': ['app.py', 'application.py', 'flask_app.py'],
-            'fastapi': ['main.py', 'app.py', 'fastapi_app.py']
-        }
-        
-        for file in self.root_path.iterdir():
-            for framework, indicators in framework_indicators.items():
-                if file.name in indicators:
-                    return framework
-        
-        # Check for requirements.txt or pyproject.toml dependencies
-        requirements_file = self.root_path / 'requirements.txt'
-        if requirements_file.exists():
-            with open(requirements_file, 'r') as f:
-                content = f.read().lower()
-                if 'django' in content:
-                    return 'django'
-                elif 'flask' in content:
-                    return 'flask'
-                elif 'fastapi' in content:
-                    return 'fastapi'
-        
-        # Check pyproject.toml
-        pyproject_file = self.root_path / 'pyproject.toml'
-        if pyproject_file.exists():
-            with open(pyproject_file, 'r') as f:
-                content = f.read().lower()
-                if 'django' in content:
-                    return 'django'
-                elif 'flask' in content:
-                    return 'flask'
-                elif 'fastapi' in content:
-                    return 'fastapi'
-        
-        return 'unknown'
+        """Detect the Python web framework being used.
+
+        After a scan, the root listing it recorded is classified directly,
+        so the root is not listed a second time.
+        """
+        root_entries = self._root_entries
+        if root_entries is None:
+            # No scan yet; list the root ourselves
+            with os.scandir(self._root_str) as it:
+                root_entries = {e.name: _entry_is_dir(e) for e in it}
+        return FrameworkDetector(self.root_path).classify_from_signals(root_entries)
     
     def scan_project(self, *, printer=None) -> Dict[str, Any]:
         """Main method to scan the project and return structured data"""
         tree, _ = self.generate_tree(printer=printer, depth=0)
+        return {
+            "metadata": self._metadata(),
+            "tree": tree
+        }
+
+    def stream_project(self, fp: BinaryIO, *, printer=None) -> Dict[str, Any]:
+        """Write the scan_project() document to a binary file, streaming the tree.
+
+        The tree comes first, as the framework is detected from the listing
+        it records. Returns the metadata.
+        """
+        fp.write(b'{"tree":')
+        self.stream_tree(fp, printer=printer)
+        metadata = self._metadata()
+        fp.write(b',"metadata":' + dumps_json(metadata) + b'}')
+        return metadata
+
+    def _metadata(self) -> Dict[str, Any]:
         framework = self.detect_framework()
         
         # Get project name, fallback to current directory name if empty
@@ -139,11 +468,8 @@ class ProjectScanner:
             project_name = self.root_path.resolve().name
         
         return {
-            "metadata": {
-                "project_name": project_name,
-                "framework": framework,
-                "scan_date": datetime.now().isoformat(),
-                "root_path": str(self.root_path.resolve())
-            },
-            "tree": tree
+            "project_name": project_name,
+            "framework": framework,
+            "scan_date": datetime.now().isoformat(),
+            "root_path": str(self.root_path.resolve())
         }
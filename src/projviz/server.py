@@ -1,11 +1,50 @@
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
-import json
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+import codecs
+import hashlib
+import os
 from pathlib import Path
+from typing import Optional, Tuple
 import uvicorn
 import logging
+from .scanner import dumps_json, read_json
+
+def _etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+def _cached_json(request: Request, body: bytes, etag: str) -> Response:
+    """Serve pre-serialized JSON, answering 304 when the client copy is current"""
+    headers = {"ETag": etag}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _read_file(target: Path, max_bytes: int) -> Tuple[bytes, bool, int]:
+    """Blocking read of at most max_bytes; returns (data, truncated, file size).
+
+    Reads one byte past the limit to detect truncation, so memory use stays
+    bounded no matter how large the file is.
+    """
+    with open(target, 'rb') as f:
+        data = f.read(max_bytes + 1)
+        size = os.fstat(f.fileno()).st_size
+    truncated = len(data) > max_bytes
+    if truncated:
+        data = data[:max_bytes]
+    return data, truncated, size
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,14 +62,36 @@ def start_server(json_file: str, host: str = 'localhost', port: int = 8000):
     templates = Jinja2Templates(directory=templates_path)
     
     # Load project data
-    with open(json_file, 'r') as f:
-        project_data = json.load(f)
+    project_data = read_json(json_file)
     try:
         meta = project_data.get("metadata", {})
         logger.info("Loaded project metadata: name=%s framework=%s", meta.get("project_name"), meta.get("framework"))
     except Exception as e:
         logger.warning("Unable to read project metadata: %s", e)
 
+    # The project data never changes while serving, so serialize the API
+    # payloads once instead of on every request, each as a (body, etag) pair
+    tree_cached: Optional[Tuple[bytes, str]] = None
+    try:
+        payload = project_data["tree"]
+        # Lightweight visibility into the shape/size of data
+        if isinstance(payload, list):
+            logger.info("/api/tree -> list with %d root items", len(payload))
+        elif isinstance(payload, dict):
+            logger.info("/api/tree -> dict with keys: %s", list(payload.keys())[:10])
+        else:
+            logger.info("/api/tree -> type=%s", type(payload).__name__)
+        tree_body = dumps_json(payload)
+        tree_cached = (tree_body, _etag(tree_body))
+    except KeyError as e:
+        logger.warning("Project data has no tree: missing key %s", e)
+    meta_cached: Optional[Tuple[bytes, str]] = None
+    try:
+        meta_body = dumps_json(project_data["metadata"])
+        meta_cached = (meta_body, _etag(meta_body))
+    except KeyError as e:
+        logger.warning("Project data has no metadata: missing key %s", e)
+
     # Resolve project root directory (for file content API)
     root_dir = None
     try:
@@ -43,6 +104,11 @@ def start_server(json_file: str, host: str = 'localhost', port: int = 8000):
     except Exception:
         root_dir = Path(json_file).resolve().parent
     
+    # Canonical root with a trailing separator, computed once for the
+    # per-request containment check in /api/file
+    root_str = os.path.realpath(root_dir)
+    root_prefix = os.path.join(root_str, '')
+    
     # Serve static files (optional assets)
     static_path = templates_path / "static"
     if static_path.exists():
@@ -51,59 +117,47 @@ def start_server(json_file: str, host: str = 'localhost', port: int = 8000):
     else:
         logger.info("No static assets directory found at %s (using CDN)", static_path)
     
+    # Pages only depend on the fixed project metadata, so render them once
+    page_meta = project_data.get("metadata", {})
+    page_context = {
+        "project_name": page_meta.get("project_name", ""),
+        "framework": page_meta.get("framework", "unknown"),
+    }
+    pages = {
+        name: templates.get_template(name).render(page_context).encode("utf-8")
+        for name in ("tree.html", "diagram.html", "uml.html")
+    }
+    
     @app.get("/", response_class=HTMLResponse)
-    async def read_root(request: Request):
-        logger.info("GET / -> render tree.html")
-        return templates.TemplateResponse("tree.html", {
-            "request": request,
-            "project_name": project_data["metadata"]["project_name"],
-            "framework": project_data["metadata"]["framework"]
-        })
+    async def read_root():
+        logger.info("GET / -> tree.html")
+        return HTMLResponse(pages["tree.html"])
     
     @app.get("/api/tree")
-    async def get_tree():
+    async def get_tree(request: Request):
         logger.info("GET /api/tree")
-        try:
-            payload = project_data["tree"]
-            # Lightweight visibility into the shape/size of data
-            if isinstance(payload, list):
-                logger.info("/api/tree -> list with %d root items", len(payload))
-            elif isinstance(payload, dict):
-                logger.info("/api/tree -> dict with keys: %s", list(payload.keys())[:10])
-            else:
-                logger.info("/api/tree -> type=%s", type(payload).__name__)
-            return JSONResponse(payload)
-        except KeyError as e:
-            logger.exception("KeyError serving /api/tree: %s", e)
-            return JSONResponse({"error": f"missing key: {e}"}, status_code=500)
-        except Exception as e:
-            logger.exception("Unexpected error serving /api/tree: %s", e)
-            return JSONResponse({"error": str(e)}, status_code=500)
+        if tree_cached is None:
+            logger.error("KeyError serving /api/tree: 'tree'")
+            return JSONResponse({"error": "missing key: 'tree'"}, status_code=500)
+        return _cached_json(request, *tree_cached)
     
-    @app.get("/diagram")
-    async def get_diagram(request: Request):
-        logger.info("GET /diagram -> render diagram.html")
-        return templates.TemplateResponse("diagram.html", {
-            "request": request,
-            "project_name": project_data["metadata"]["project_name"]
-        })
+    @app.get("/diagram", response_class=HTMLResponse)
+    async def get_diagram():
+        logger.info("GET /diagram -> diagram.html")
+        return HTMLResponse(pages["diagram.html"])
 
-    @app.get("/uml")
-    async def get_uml(request: Request):
-        logger.info("GET /uml -> render uml.html")
-        return templates.TemplateResponse("uml.html", {
-            "request": request,
-            "project_name": project_data["metadata"]["project_name"]
-        })
+    @app.get("/uml", response_class=HTMLResponse)
+    async def get_uml():
+        logger.info("GET /uml -> uml.html")
+        return HTMLResponse(pages["uml.html"])
     
     @app.get("/api/metadata")
-    async def get_metadata():
+    async def get_metadata(request: Request):
         logger.info("GET /api/metadata")
-        try:
-            return JSONResponse(project_data["metadata"])
-        except Exception as e:
-            logger.exception("Error serving /api/metadata: %s", e)
-            return JSONResponse({"error": str(e)}, status_code=500)
+        if meta_cached is None:
+            logger.error("Error serving /api/metadata: 'metadata'")
+            return JSONResponse({"error": "'metadata'"}, status_code=500)
+        return _cached_json(request, *meta_cached)
 
     @app.get("/api/file")
     async def get_file(path: str):
@@ -113,23 +167,25 @@ def start_server(json_file: str, host: str = 'localhost', port: int = 8000):
         logger.info("GET /api/file path=%s", path)
         if not path:
             raise HTTPException(status_code=400, detail="Missing path parameter")
-        # Normalize and security check
-        target = (root_dir / path).resolve()
-        try:
-            target.relative_to(root_dir)
-        except ValueError:
+        # Normalize and security check: no parent references, and the
+        # symlink-resolved target must stay under the precomputed root prefix
+        if '..' in path.replace('\\', '/').split('/'):
+            raise HTTPException(status_code=403, detail="Path outside project root")
+        candidate = os.path.realpath(os.path.join(root_str, path))
+        if not candidate.startswith(root_prefix):
             raise HTTPException(status_code=403, detail="Path outside project root")
-        if not target.exists() or not target.is_file():
+        target = Path(candidate)
+        # Filesystem calls run in the threadpool so they don't block the event loop
+        if not await run_in_threadpool(target.is_file):
             raise HTTPException(status_code=404, detail="File not found")
         # Read with size limit
         try:
             max_bytes = 512 * 1024  # 512KB
-            data = target.read_bytes()
-            truncated = len(data) > max_bytes
-            if truncated:
-                data = data[:max_bytes]
+            data, truncated, size = await run_in_threadpool(_read_file, target, max_bytes)
             try:
-                text = data.decode('utf-8')
+                # Truncation may split a multi-byte character; the incremental
+                # decoder drops that partial tail instead of failing the decode
+                text = codecs.getincrementaldecoder('utf-8')().decode(data, final=not truncated)
                 encoding = 'utf-8'
             except UnicodeDecodeError:
                 # Fallback to latin-1 to at least display something
@@ -139,7 +195,7 @@ def start_server(json_file: str, host: str = 'localhost', port: int = 8000):
                 "path": path,
                 "encoding": encoding,
                 "truncated": truncated,
-                "size": target.stat().st_size,
+                "size": size,
                 "content": text
             })
         except Exception as e:
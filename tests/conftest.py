@@ -0,0 +1,17 @@
+import pytest
+from pathlib import Path
+
+
+@pytest.fixture
+def fake_project(fs, request):
+    """Give a test its own project directory on pyfakefs' in-memory filesystem.
+
+    The path is unique per test, so path-keyed caches never carry over.
+    On test classes it is also bound to self.temp_path and self.temp_dir.
+    """
+    path = Path('/projects', request.node.name)
+    path.mkdir(parents=True)
+    if request.instance is not None:
+        request.instance.temp_path = path
+        request.instance.temp_dir = str(path)
+    return path
@@ -0,0 +1,87 @@
+import os
+import pytest
+from fastapi.testclient import TestClient
+import projviz.server as server
+from projviz.scanner import ProjectScanner, write_json
+
+class TestApi:
+    """Exercises the app start_server builds, without binding a port"""
+
+    @pytest.fixture(autouse=True)
+    def client(self, tmp_path, monkeypatch):
+        """Scan a small project and capture the app instead of serving it"""
+        self.temp_path = tmp_path
+        self.project = tmp_path / 'project'
+        (self.project / 'sub').mkdir(parents=True)
+        (self.project / 'app.py').write_text('from flask import Flask')
+        (self.project / 'sub' / 'notes.txt').write_text('hello')
+        (tmp_path / 'secret.txt').write_text('outside')
+        json_file = tmp_path / 'project_structure.json'
+        write_json(ProjectScanner(str(self.project)).scan_project(), str(json_file))
+
+        captured = {}
+        monkeypatch.setattr(server.uvicorn, 'run', lambda app, **kwargs: captured.setdefault('app', app))
+        server.start_server(str(json_file))
+        self.client = TestClient(captured['app'])
+
+    def get_file(self, path):
+        return self.client.get('/api/file', params={'path': path})
+
+    def test_file_inside_root(self):
+        """Test that a project file is returned with its metadata"""
+        response = self.get_file('sub/notes.txt')
+        assert response.status_code == 200
+        assert response.json() == {
+            'path': 'sub/notes.txt', 'encoding': 'utf-8', 'truncated': False, 'size': 5, 'content': 'hello'
+        }
+
+    @pytest.mark.parametrize('path', ['../secret.txt', 'sub/../app.py', 'sub/../../secret.txt'])
+    def test_file_parent_references_rejected(self, path):
+        """Test that any '..' component is refused, even one that stays inside the root"""
+        assert self.get_file(path).status_code == 403
+
+    def test_file_absolute_path_rejected(self):
+        """Test that an absolute path cannot escape the root"""
+        assert self.get_file(str(self.temp_path / 'secret.txt')).status_code == 403
+
+    @pytest.mark.skipif(os.name == 'nt', reason='symlinks need privileges on Windows')
+    def test_file_symlink_outside_root_rejected(self):
+        """Test that a symlink is judged by the file it resolves to"""
+        (self.project / 'link.txt').symlink_to(self.temp_path / 'secret.txt')
+        assert self.get_file('link.txt').status_code == 403
+
+    def test_file_missing(self):
+        """Test that directories and absent files are not found"""
+        assert self.get_file('sub').status_code == 404
+        assert self.get_file('nope.txt').status_code == 404
+
+    def test_file_limit_splits_multibyte_character(self):
+        """Test that a cut through a UTF-8 sequence drops the partial character"""
+        limit = 512 * 1024
+        (self.project / 'big.txt').write_bytes(b'a' * (limit - 1) + 'é'.encode('utf-8'))
+
+        body = self.get_file('big.txt').json()
+        assert body['encoding'] == 'utf-8'
+        assert body['truncated'] is True
+        assert body['size'] == limit + 1
+        assert body['content'] == 'a' * (limit - 1)
+
+    def test_tree_etag_revalidation(self):
+        """Test that /api/tree answers 304 to a current ETag and 200 otherwise"""
+        response = self.client.get('/api/tree')
+        etag = response.headers['etag']
+        assert response.status_code == 200
+        assert response.json()['value'] == 'project'
+
+        cached = self.client.get('/api/tree', headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.content == b''
+        assert cached.headers['etag'] == etag
+        assert self.client.get('/api/tree', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+    def test_metadata(self):
+        """Test that /api/metadata serves the scanned metadata with an ETag"""
+        response = self.client.get('/api/metadata')
+        assert response.status_code == 200
+        assert response.json()['framework'] == 'flask'
+        assert 'etag' in response.headers
@@ -1,21 +1,18 @@
 import pytest
-import tempfile
 import json
-from pathlib import Path
+import os
+import stat
 from click.testing import CliRunner
 from projviz.cli import main
 
 class TestCLI:
-    def setup_method(self):
-        """Set up a temporary directory for testing"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.temp_path = Path(self.temp_dir)
-        self.runner = CliRunner()
+    runner = CliRunner()
     
-    def teardown_method(self):
-        """Clean up temporary directory"""
-        import shutil
-        shutil.rmtree(self.temp_dir)
+    @pytest.fixture(autouse=True)
+    def temp_project(self, tmp_path, monkeypatch):
+        """Run every test inside its own temporary working directory"""
+        monkeypatch.chdir(tmp_path)
+        self.temp_path = tmp_path
     
     def test_main_command(self):
         """Test main command help"""
@@ -47,11 +44,52 @@ class TestCLI:
         assert result.exit_code == 0
         assert output_file.exists()
         
-        # Verify JSON content
-        with open(output_file) as f:
-            data = json.load(f)
-        assert 'metadata' in data
-        assert 'tree' in data
+        # Both top-level keys are present; no need to parse the whole file
+        raw = output_file.read_bytes()
+        assert b'"metadata"' in raw
+        assert b'"tree"' in raw
+    
+    def test_scan_command_stream(self):
+        """Test that --stream writes the same document shape"""
+        (self.temp_path / 'manage.py').write_text('import django')
+        output_file = self.temp_path / 'project_structure.json'
+        
+        result = self.runner.invoke(main, [
+            'scan', '--path', str(self.temp_path), '--output', str(output_file), '--stream'
+        ])
+        
+        assert result.exit_code == 0
+        assert 'Detected framework: django' in result.output
+        data = json.loads(output_file.read_text())
+        assert data['metadata']['framework'] == 'django'
+        assert [node['value'] for node in data['tree']['data']] == ['manage.py']
+    
+    def test_scan_command_stream_glob_characters_in_output_name(self):
+        """Test that the temporary output file stays out of the tree when its name looks like a glob"""
+        output_file = self.temp_path / 'tree[v2].json'
+        
+        result = self.runner.invoke(main, [
+            'scan', '--path', str(self.temp_path), '--output', str(output_file), '--stream'
+        ])
+        
+        assert result.exit_code == 0
+        data = json.loads(output_file.read_text())
+        assert data['tree']['data'] == []
+    
+    @pytest.mark.skipif(os.name == 'nt', reason='POSIX file modes')
+    def test_scan_command_stream_file_mode(self):
+        """Test that --stream output gets the usual umask-derived mode, not mkstemp's 0600"""
+        output_file = self.temp_path / 'project_structure.json'
+        umask = os.umask(0o022)
+        try:
+            result = self.runner.invoke(main, [
+                'scan', '--path', str(self.temp_path), '--output', str(output_file), '--stream'
+            ])
+        finally:
+            os.umask(umask)
+        
+        assert result.exit_code == 0
+        assert stat.S_IMODE(output_file.stat().st_mode) == 0o644
     
     def test_scan_command_django_detection(self):
         """Test scan command with Django project"""
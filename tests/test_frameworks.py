@@ -1,19 +1,9 @@
+import os
 import pytest
-import tempfile
-from pathlib import Path
 from projviz.framework_detection import FrameworkDetector
 
+@pytest.mark.usefixtures('fake_project')
 class TestFrameworkDetection:
-    def setup_method(self):
-        """Set up a temporary directory for testing"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.temp_path = Path(self.temp_dir)
-    
-    def teardown_method(self):
-        """Clean up temporary directory"""
-        import shutil
-        shutil.rmtree(self.temp_dir)
-    
     def test_detector_initialization(self):
         """Test framework detector initialization"""
         detector = FrameworkDetector(self.temp_path)
@@ -71,6 +61,37 @@ class TestFrameworkDetection:
         result = detector.detect_by_dependencies()
         assert result == 'fastapi'
     
+    def test_detect_by_dependencies_ignores_non_dependency_mentions(self):
+        """Test that only declared dependencies count, not other mentions"""
+        (self.temp_path / 'pyproject.toml').write_text(
+            '[project]\n'
+            'description = "Ported from Django"\n'
+            'dependencies = ["requests>=2", "Flask[async]>=2; python_version>\'3.8\'"]\n'
+        )
+        detector = FrameworkDetector(self.temp_path)
+        result = detector.detect_by_dependencies()
+        assert result == 'flask'
+    
+    def test_detect_by_dependencies_sees_file_changes(self):
+        """Test that cached dependency parses are refreshed when the file changes"""
+        requirements = self.temp_path / 'requirements.txt'
+        requirements.write_text('requests==2.0.0')
+        assert FrameworkDetector(self.temp_path).detect_by_dependencies() is None
+        
+        requirements.write_text('requests==2.0.0\nflask==2.0.0')
+        assert FrameworkDetector(self.temp_path).detect_by_dependencies() == 'flask'
+    
+    def test_detect_by_dependencies_sees_same_tick_rewrite(self):
+        """Test that a fresh file is not cached, so a rewrite keeping mtime and size is seen"""
+        requirements = self.temp_path / 'requirements.txt'
+        requirements.write_text('requests==2.0.0')
+        mtime_ns = requirements.stat().st_mtime_ns
+        assert FrameworkDetector(self.temp_path).detect_by_dependencies() is None
+        
+        requirements.write_text('flask==2.000000')
+        os.utime(requirements, ns=(mtime_ns, mtime_ns))
+        assert FrameworkDetector(self.temp_path).detect_by_dependencies() == 'flask'
+    
     def test_detect_by_code_analysis_flask(self):
         """Test Flask detection by code analysis"""
         (self.temp_path / 'myapp.py').write_text('from flask import Flask\napp = Flask(__name__)')
@@ -85,6 +106,14 @@ class TestFrameworkDetection:
         result = detector.detect_by_code_analysis()
         assert result == 'fastapi'
     
+    def test_detect_by_code_analysis_skips_empty_files(self):
+        """Test that empty Python files do not break code analysis"""
+        (self.temp_path / '__init__.py').write_text('')
+        (self.temp_path / 'views.py').write_text('from django.http import HttpResponse')
+        detector = FrameworkDetector(self.temp_path)
+        result = detector.detect_by_code_analysis()
+        assert result == 'django'
+    
     def test_detect_framework_priority(self):
         """Test that file detection takes priority over other methods"""
         # Create both file and requirements.txt
@@ -95,6 +124,33 @@ class TestFrameworkDetection:
         result = detector.detect_framework()
         assert result == 'django'  # File detection should take priority
     
+    def test_detect_framework_combines_evidence(self):
+        """Test that a shared file name is resolved by the declared dependency"""
+        (self.temp_path / 'app.py').write_text('app = None')
+        (self.temp_path / 'templates').mkdir()
+        (self.temp_path / 'requirements.txt').write_text('fastapi==0.100.0')
+        
+        detector = FrameworkDetector(self.temp_path)
+        result = detector.detect()
+        assert result == 'fastapi'
+    
+    def test_detect_framework_shared_files_defer_to_dependency(self):
+        """Test that several shared file names do not outvote a declared dependency"""
+        (self.temp_path / 'main.py').write_text('')
+        (self.temp_path / 'app.py').write_text('')
+        (self.temp_path / 'requirements.txt').write_text('flask==2.0')
+        
+        detector = FrameworkDetector(self.temp_path)
+        assert detector.detect_framework() == 'flask'
+    
+    def test_detect_framework_ignores_shared_directories_alone(self):
+        """Test that a shared directory such as templates/ does not pick a framework by itself"""
+        (self.temp_path / 'templates').mkdir()
+        (self.temp_path / 'api').mkdir()
+        
+        detector = FrameworkDetector(self.temp_path)
+        assert detector.detect() == 'unknown'
+    
     def test_detect_framework_unknown(self):
         """Test unknown framework detection"""
         (self.temp_path / 'random_file.txt').write_text('some content')
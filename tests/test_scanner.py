@@ -1,20 +1,14 @@
 import pytest
-import tempfile
+import io
 import json
+import os
+import time
 from pathlib import Path
-from projviz.scanner import ProjectScanner
+import projviz.scanner as scanner_module
+from projviz.scanner import ProjectScanner, dumps_json, read_json, write_json
 
+@pytest.mark.usefixtures('fake_project')
 class TestProjectScanner:
-    def setup_method(self):
-        """Set up a temporary directory for testing"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.temp_path = Path(self.temp_dir)
-    
-    def teardown_method(self):
-        """Clean up temporary directory"""
-        import shutil
-        shutil.rmtree(self.temp_dir)
-    
     def test_scanner_initialization(self):
         """Test scanner initialization"""
         scanner = ProjectScanner(self.temp_dir)
@@ -54,6 +48,71 @@ class TestProjectScanner:
         assert dir_node['value'] == 'test_dir'
         assert len(dir_node['data']) == 1  # nested_file.txt
     
+    def test_node_ids(self):
+        """Test that node ids are pre-order ints, or strings when requested"""
+        (self.temp_path / 'test_dir').mkdir()
+        (self.temp_path / 'test_dir' / 'nested_file.txt').write_text('nested content')
+        (self.temp_path / 'test_file.py').write_text('print("hello")')
+        
+        tree, _ = ProjectScanner(self.temp_dir).generate_tree()
+        assert tree['id'] == 0
+        assert tree['data'][0]['id'] == 1
+        assert tree['data'][0]['data'][0]['id'] == 2
+        assert tree['data'][1]['id'] == 3
+        
+        tree, _ = ProjectScanner(self.temp_dir, stringify_ids=True).generate_tree()
+        assert tree['id'] == '0'
+        assert tree['data'][0]['data'][0]['id'] == '2'
+    
+    @pytest.mark.parametrize('use_orjson', [True, False])
+    def test_json_roundtrip_of_undecodable_file_name(self, use_orjson, monkeypatch):
+        """Test that a surrogate-escaped (non UTF-8) file name is written and read back"""
+        if not use_orjson:
+            monkeypatch.setattr(scanner_module, 'orjson', None)
+        (self.temp_path / 'bad\udcff.txt').write_text('x')
+        
+        result = ProjectScanner(self.temp_dir).scan_project()
+        output = self.temp_path / 'out.json'
+        write_json(result, str(output))
+        assert b'"bad\\udcff.txt"' in dumps_json(result['tree'])
+        assert read_json(str(output))['tree']['data'][0]['value'] == 'bad\udcff.txt'
+    
+    def test_parallel_scan_matches_serial(self):
+        """Test that the threaded scan builds the same tree and output order"""
+        for top in ('alpha', 'beta', 'gamma'):
+            (self.temp_path / top / 'inner').mkdir(parents=True)
+            (self.temp_path / top / 'inner' / 'leaf.txt').write_text('leaf')
+            (self.temp_path / top / 'module.py').write_text('x = 1')
+        (self.temp_path / 'setup.py').write_text('')
+        
+        serial_events, parallel_events = [], []
+        serial = ProjectScanner(self.temp_dir, max_workers=1)
+        parallel = ProjectScanner(self.temp_dir, max_workers=4)
+        serial_tree = serial.scan_project(printer=lambda *e: serial_events.append(e))['tree']
+        parallel_tree = parallel.scan_project(printer=lambda *e: parallel_events.append(e))['tree']
+        
+        assert parallel_tree == serial_tree
+        assert parallel_events == serial_events
+        assert parallel.node_counter == serial.node_counter == 14
+        assert parallel.folder_count == serial.folder_count == 7
+        assert parallel.file_count == serial.file_count == 7
+    
+    def test_stream_tree_matches_generate_tree(self):
+        """Test that the streamed JSON decodes to the same tree as generate_tree"""
+        (self.temp_path / 'pkg' / 'empty').mkdir(parents=True)
+        (self.temp_path / 'pkg' / 'caf\u00e9 "q".py').write_text('x = 1')
+        (self.temp_path / 'README.md').write_text('# readme')
+        
+        expected, _ = ProjectScanner(self.temp_dir).generate_tree()
+        scanner = ProjectScanner(self.temp_dir)
+        buffer = io.BytesIO()
+        count = scanner.stream_tree(buffer)
+        
+        assert json.loads(buffer.getvalue()) == expected
+        assert count == scanner.node_counter == 5
+        assert scanner.folder_count == 3
+        assert scanner.root_child_count == 2
+    
     def test_ignore_patterns(self):
         """Test that ignore patterns are respected"""
         # Create files that should be ignored
@@ -68,6 +127,23 @@ class TestProjectScanner:
         assert len(tree['data']) == 1
         assert tree['data'][0]['value'] == 'normal_file.py'
     
+    def test_ignore_patterns_exact_glob_and_substring(self):
+        """Test exact-name, glob and substring ignores together"""
+        (self.temp_path / '.gitignore').write_text('*.pyc')
+        (self.temp_path / 'build_output').mkdir()
+        (self.temp_path / 'normal_file.py').write_text('print("hello")')
+        (self.temp_path / 'normal_file.pyc').write_bytes(b'')
+        
+        scanner = ProjectScanner(self.temp_dir)
+        scanner.ignore_patterns.append('*.pyc')
+        scanner.ignore_substrings.append('build')
+        tree, _ = scanner.generate_tree()
+        
+        # '.git' only hides exact matches, '*.pyc' is a glob and
+        # 'build' hides any name containing it
+        names = [node['value'] for node in tree['data']]
+        assert names == ['.gitignore', 'normal_file.py']
+    
     def test_detect_framework_django(self):
         """Test Django framework detection"""
         # Create Django-like structure
@@ -96,6 +172,28 @@ class TestProjectScanner:
         framework = scanner.detect_framework()
         assert framework == 'fastapi'
     
+    def test_detect_framework_reuses_scanned_root(self):
+        """Test that detection after a scan uses the recorded root listing"""
+        (self.temp_path / 'manage.py').write_text('import django')
+        
+        scanner = ProjectScanner(self.temp_dir)
+        scanner.generate_tree()
+        (self.temp_path / 'manage.py').unlink()
+        assert scanner.detect_framework() == 'django'
+    
+    def test_scan_project_detects_symlinked_and_ignored_files(self):
+        """Test that root files left out of the tree still count for detection"""
+        (self.temp_path / 'real').mkdir()
+        (self.temp_path / 'real' / 'requirements.txt').write_text('django==4.0.0')
+        (self.temp_path / 'requirements.txt').symlink_to(self.temp_path / 'real' / 'requirements.txt')
+        (self.temp_path / 'wsgi.py').write_text('')
+        
+        scanner = ProjectScanner(self.temp_dir)
+        scanner.ignore_patterns.append('wsgi.py')
+        result = scanner.scan_project()
+        assert result['metadata']['framework'] == 'django'
+        assert [child['value'] for child in result['tree']['data']] == ['real']
+    
     def test_detect_framework_by_requirements(self):
         """Test framework detection by requirements.txt"""
         (self.temp_path / 'requirements.txt').write_text('django==4.0.0\nrequests==2.25.0')
@@ -104,6 +202,15 @@ class TestProjectScanner:
         framework = scanner.detect_framework()
         assert framework == 'django'
     
+    def test_scan_project_shared_files_defer_to_dependency(self):
+        """Test that a scan weighs shared file names below a declared dependency"""
+        (self.temp_path / 'main.py').write_text('')
+        (self.temp_path / 'app.py').write_text('')
+        (self.temp_path / 'requirements.txt').write_text('flask==2.0')
+        
+        result = ProjectScanner(self.temp_dir).scan_project()
+        assert result['metadata']['framework'] == 'flask'
+    
     def test_detect_framework_unknown(self):
         """Test unknown framework detection"""
         (self.temp_path / 'random_file.txt').write_text('some content')
@@ -112,6 +219,15 @@ class TestProjectScanner:
         framework = scanner.detect_framework()
         assert framework == 'unknown'
     
+    def test_scan_project_ignores_directory_and_code_hints(self):
+        """Test that a scan classifies by root files and dependencies only"""
+        (self.temp_path / 'api').mkdir()
+        (self.temp_path / 'templates').mkdir()
+        (self.temp_path / 'api' / 'views.py').write_text('from flask import Flask')
+        
+        result = ProjectScanner(self.temp_dir).scan_project()
+        assert result['metadata']['framework'] == 'unknown'
+    
     def test_scan_project(self):
         """Test complete project scanning"""
         # Create a simple project structure
@@ -126,3 +242,29 @@ class TestProjectScanner:
         assert result['metadata']['framework'] == 'flask'
         assert result['metadata']['project_name'] == Path(self.temp_dir).name
         assert 'scan_date' in result['metadata']
+
+class TestListingCache:
+    """Runs on the real filesystem: cache entries are validated by directory
+    mtimes, which pyfakefs does not update when entries are added"""
+    
+    def test_listing_cache_revalidates_nested_changes(self, tmp_path):
+        """Test that cached listings are reused but nested changes still show up"""
+        (tmp_path / 'pkg' / 'sub').mkdir(parents=True)
+        (tmp_path / 'pkg' / 'sub' / 'a.py').write_text('a = 1')
+        
+        scanner = ProjectScanner(str(tmp_path), max_workers=1, listing_cache_size=100)
+        scanner.scan_project()
+        # Just-modified directories could still change within their mtime tick
+        assert len(scanner._dir_cache) == 0
+        
+        settled = time.time() - 60
+        for directory in (tmp_path, tmp_path / 'pkg', tmp_path / 'pkg' / 'sub'):
+            os.utime(directory, (settled, settled))
+        first = scanner.scan_project()['tree']
+        assert len(scanner._dir_cache) == 3
+        
+        (tmp_path / 'pkg' / 'sub' / 'b.py').write_text('b = 2')
+        second = scanner.scan_project()['tree']
+        sub = second['data'][0]['data'][0]
+        assert [node['value'] for node in sub['data']] == ['a.py', 'b.py']
+        assert first['data'][0]['data'][0]['data'][0]['value'] == 'a.py'